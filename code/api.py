@@ -1,54 +1,319 @@
+import asyncio
 import datetime as dt
-from typing import List, Dict, Any
+import json
+from functools import lru_cache
+from typing import List, Dict, Any, Mapping, Optional
 
+import aiohttp
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+from code.cache import get_cached, put_cached, get_meta, put_meta
 from code.constants import SUPPORTED_CURRENCIES
 
 """CORE LOGIC FOR NBU API INTERACTION"""
 
 NBU_BASE_URL = "https://bank.gov.ua/NBUStatService/v1/statdirectory/exchange"
+# Historical range endpoint: one currency over a span of dates in a single request
+NBU_RANGE_URL = "https://bank.gov.ua/NBU_Exchange/exchange_site"
+
+# Shared session, so repeated queries reuse pooled keep-alive connections
+# instead of paying a fresh TCP+TLS handshake each time
+_SESSION = requests.Session()
+_SESSION.mount(
+    "https://",
+    HTTPAdapter(pool_connections=4, pool_maxsize=32, max_retries=Retry(total=2, backoff_factor=0.3)),
+)
+_SESSION.headers.update({"Accept-Encoding": "gzip", "Connection": "keep-alive"})
+
+# Rates are passed around column-wise: {"iso_date": [...], "cc": [...], "rate": [...]}
+RateColumns = Dict[str, List[Any]]
+RATE_COLUMNS = ("iso_date", "cc", "rate")
+
+
+def _parse_json(body: bytes) -> Any:
+    """Parse a response body, with orjson when it is installed (faster than the stdlib json)."""
+    if orjson is not None:
+        return orjson.loads(body)
+    return json.loads(body)
+
+
+def _empty_columns() -> RateColumns:
+    """Return an empty column-wise rates container."""
+    return {name: [] for name in RATE_COLUMNS}
+
+
+def _to_columns(data: List[Dict[str, Any]], date: dt.date) -> RateColumns:
+    """
+    Convert raw NBU records for one date into column lists.
+    Only supported currencies are kept, and each row is stamped with the ISO date.
+    """
+    columns = _empty_columns()
+    iso_date = date.isoformat()
+
+    for record in data:
+        if record.get("cc") not in SUPPORTED_CURRENCIES:
+            continue
+        columns["iso_date"].append(iso_date)
+        columns["cc"].append(record["cc"])
+        columns["rate"].append(record.get("rate"))
+
+    return columns
+
+
+@lru_cache(maxsize=64)
+def _url_for(date: dt.date) -> str:
+    """Build (once per date) the NBU URL for a date's rates."""
+    return f"{NBU_BASE_URL}?date={date.strftime('%Y%m%d')}&json"
+
+
+def _range_url(cc: str, start: dt.date, end: dt.date) -> str:
+    """Build the NBU range URL for one currency between two dates (inclusive)."""
+    return (
+        f"{NBU_RANGE_URL}?start={start.strftime('%Y%m%d')}&end={end.strftime('%Y%m%d')}"
+        f"&valcode={cc.lower()}&sort=exchangedate&order=asc&json"
+    )
+
+
+def _range_to_columns(data: List[Dict[str, Any]], start: dt.date, end: dt.date) -> RateColumns:
+    """
+    Convert raw NBU range records into column lists.
+    Range records carry their date as 'exchangedate' (DD.MM.YYYY); it is normalized to ISO.
+    """
+    columns = _empty_columns()
+
+    for record in data:
+        if record.get("cc") not in SUPPORTED_CURRENCIES:
+            continue
+        date = dt.datetime.strptime(record["exchangedate"], "%d.%m.%Y").date()
+        if not start <= date <= end:
+            continue
+        columns["iso_date"].append(date.isoformat())
+        columns["cc"].append(record["cc"])
+        columns["rate"].append(record.get("rate"))
+
+    return columns
+
+
+def _cached_columns(date: dt.date) -> Optional[RateColumns]:
+    """Return cached rate columns for a date, or None if there is no usable entry."""
+    cached = get_cached(date)
+    # Entries in any other layout are treated as a miss and get overwritten
+    if not isinstance(cached, dict) or any(name not in cached for name in RATE_COLUMNS):
+        return None
+    return cached
+
+
+def _is_final(date: dt.date) -> bool:
+    """Rates for past dates never change; today's may still be updated."""
+    return date < dt.date.today()
+
+
+def _conditional_headers(date: dt.date, cached: Optional[RateColumns]) -> Dict[str, str]:
+    """
+    Build If-None-Match / If-Modified-Since headers from the validators saved with a cached entry,
+    so an unchanged response comes back as a bodiless 304.
+    Only sent when there is a cached body to fall back on.
+    """
+    if cached is None:
+        return {}
+
+    meta = get_meta(date) or {}
+    headers = {}
+    if meta.get("etag"):
+        headers["If-None-Match"] = meta["etag"]
+    if meta.get("last_modified"):
+        headers["If-Modified-Since"] = meta["last_modified"]
+    return headers
+
+
+def _store_in_cache(date: dt.date, columns: RateColumns, response_headers: Mapping[str, str]) -> None:
+    """
+    Cache rate columns for a date, along with the response's ETag / Last-Modified validators.
+    A failed write only costs a re-fetch next run.
+    """
+    if not columns["cc"]:
+        return
 
+    meta = {}
+    if "ETag" in response_headers:
+        meta["etag"] = response_headers["ETag"]
+    if "Last-Modified" in response_headers:
+        meta["last_modified"] = response_headers["Last-Modified"]
 
-def fetch_rates_for_date(date: dt.date) -> List[Dict[str, Any]]:
+    try:
+        put_cached(date, columns)
+        put_meta(date, meta)
+    except OSError:
+        pass
+
+
+def fetch_rates_for_date(date: dt.date) -> RateColumns:
     """
     Fetch NBU exchange rates for a specific date.
     Only USD and EUR currencies are returned.
 
     :param date: datetime.date object.
-    :return: List of rate dictionaries from the NBU API (USD and EUR only).
+    :return: Dict of 'iso_date', 'cc' and 'rate' lists (USD and EUR only).
     """
-    date_str = date.strftime("%Y%m%d")
-    url = f"{NBU_BASE_URL}?date={date_str}&json"
+    cached = _cached_columns(date)
+    if cached is not None and _is_final(date):
+        return cached
+
+    url = _url_for(date)
 
-    response = requests.get(url, timeout=10)
+    response = _SESSION.get(url, headers=_conditional_headers(date, cached), timeout=10)
+    if response.status_code == 304:
+        return cached
     response.raise_for_status()
 
-    data = response.json()
+    data = _parse_json(response.content)
 
-    # Filter to only supported currencies
-    data = [record for record in data if record.get("cc") in SUPPORTED_CURRENCIES]
+    columns = _to_columns(data, date)
+    _store_in_cache(date, columns, response.headers)
+    return columns
 
-    # normalized ISO date field for consistency
-    for record in data:
-        record["iso_date"] = date.isoformat()
 
-    return data
+async def _fetch_one(session: aiohttp.ClientSession, date: dt.date) -> RateColumns:
+    """
+    Async counterpart of fetch_rates_for_date, sharing one aiohttp session.
+
+    :param session: Open aiohttp session.
+    :param date: datetime.date object.
+    :return: Dict of 'iso_date', 'cc' and 'rate' lists (USD and EUR only).
+    """
+    cached = _cached_columns(date)
+    if cached is not None and _is_final(date):
+        return cached
+
+    url = _url_for(date)
+
+    async with session.get(url, headers=_conditional_headers(date, cached)) as response:
+        if response.status == 304:
+            return cached
+        response.raise_for_status()
+        data = _parse_json(await response.read())
+        response_headers = response.headers
 
+    columns = _to_columns(data, date)
+    _store_in_cache(date, columns, response_headers)
+    return columns
 
-def fetch_last_n_days(n: int = 30) -> List[Dict[str, Any]]:
+
+async def fetch_range_for_currency(
+    session: aiohttp.ClientSession, cc: str, start: dt.date, end: dt.date
+) -> RateColumns:
     """
-    Fetch NBU exchange rates for the last n days (including today).
+    Fetch NBU exchange rates of one currency for every date between start and end, in one request.
+    Raises ValueError if the endpoint answers with anything other than a list of records.
+
+    :param session: Open aiohttp session.
+    :param cc: Currency code (USD or EUR).
+    :param start: First date (inclusive).
+    :param end: Last date (inclusive).
+    :return: Dict of 'iso_date', 'cc' and 'rate' lists, in date order.
+    """
+    async with session.get(_range_url(cc, start, end)) as response:
+        response.raise_for_status()
+        data = _parse_json(await response.read())
+
+    # Anything but a list of records (e.g. an error object) means the endpoint is unavailable
+    if not isinstance(data, list) or not all(isinstance(record, dict) for record in data):
+        raise ValueError(f"Unexpected NBU range response for {cc}")
+
+    return _range_to_columns(data, start, end)
+
+
+async def _fetch_ranges(session: aiohttp.ClientSession, dates: List[dt.date]) -> Dict[dt.date, RateColumns]:
+    """
+    Fetch the span covering the given past dates with one range request per currency, split by date.
+    Only dates with a rate for every supported currency are returned (and cached); an unavailable
+    range endpoint returns nothing, so those dates fall back to per-day requests.
+
+    :param session: Open aiohttp session.
+    :param dates: Dates that need downloading.
+    :return: Rate columns per date.
+    """
+    start, end = min(dates), max(dates)
+
+    try:
+        parts = await asyncio.gather(
+            *[fetch_range_for_currency(session, cc, start, end) for cc in SUPPORTED_CURRENCIES]
+        )
+    except (aiohttp.ClientError, asyncio.TimeoutError, ValueError, KeyError, TypeError):
+        return {}
+
+    by_date: Dict[dt.date, RateColumns] = {}
+    for part in parts:
+        for iso_date, cc, rate in zip(part["iso_date"], part["cc"], part["rate"]):
+            daily_columns = by_date.setdefault(dt.date.fromisoformat(iso_date), _empty_columns())
+            daily_columns["iso_date"].append(iso_date)
+            daily_columns["cc"].append(cc)
+            daily_columns["rate"].append(rate)
+
+    wanted = set(dates)
+    complete = {
+        date: daily_columns
+        for date, daily_columns in by_date.items()
+        if date in wanted and set(daily_columns["cc"]) == set(SUPPORTED_CURRENCIES)
+    }
+    for date, daily_columns in complete.items():
+        _store_in_cache(date, daily_columns, {})
+
+    return complete
+
+
+async def _fetch_last_n_days_async(n: int) -> RateColumns:
+    """
+    Download what is not cached, then merge all days.
+    With more uncached past days than currencies, one range request per currency replaces their
+    per-day requests. Today is fetched alongside the range requests; any days the range did not
+    cover (or all of them, if the range endpoint fails) are fetched concurrently afterwards.
 
     :param n: Number of days to go back from today.
-    :return: Combined list of rate records for all days.
+    :return: Combined rate columns for all days.
     """
     today = dt.date.today()
-    all_records: List[Dict[str, Any]] = []
+    dates = [today - dt.timedelta(days=i) for i in range(n)]
+
+    # Past dates not cached yet. Today is left to the per-day path, which revalidates it with
+    # the saved ETag / Last-Modified instead of overwriting them with a range result.
+    missing = [day for day in dates if _is_final(day) and _cached_columns(day) is None]
 
-    for i in range(n):
-        day = today - dt.timedelta(days=i)
-        daily_rates = fetch_rates_for_date(day)
-        all_records.extend(daily_rates)
+    timeout = aiohttp.ClientTimeout(total=10)
+    async with aiohttp.ClientSession(timeout=timeout) as session:
+        per_day: Dict[dt.date, RateColumns] = {}
+        if len(missing) > len(SUPPORTED_CURRENCIES):
+            # Today's request runs alongside the range requests instead of waiting for them
+            per_day[today], ranged = await asyncio.gather(
+                _fetch_one(session, today), _fetch_ranges(session, missing)
+            )
+            per_day.update(ranged)
 
-    return all_records
\ No newline at end of file
+        remaining = [day for day in dates if day not in per_day]
+        results = await asyncio.gather(*[_fetch_one(session, day) for day in remaining])
+        per_day.update(zip(remaining, results))
+
+    all_columns = _empty_columns()
+    for day in dates:
+        for name in RATE_COLUMNS:
+            all_columns[name].extend(per_day[day][name])
+
+    return all_columns
+
+
+def fetch_last_n_days(n: int = 30) -> RateColumns:
+    """
+    Fetch NBU exchange rates for the last n days (including today).
+    Uncached days are batched into range requests where possible, and otherwise requested concurrently.
+
+    :param n: Number of days to go back from today.
+    :return: Dict of 'iso_date', 'cc' and 'rate' lists for all days.
+    """
+    return asyncio.run(_fetch_last_n_days_async(n))
@@ -0,0 +1,82 @@
+"""On-disk cache of NBU responses, keyed by date."""
+
+import datetime as dt
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+
+CACHE_DIR = Path("data/.cache")
+
+
+def _cache_path(date: dt.date, suffix: str = ".json") -> Path:
+    """Path of the cache file for a given date."""
+    return CACHE_DIR / f"{date.isoformat()}{suffix}"
+
+
+def _read_json(path: Path) -> Optional[Any]:
+    """Read a JSON cache file; missing or unreadable files are treated as a miss."""
+    try:
+        with open(path, "r", encoding="utf-8") as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_json(path: Path, obj: Any) -> None:
+    """
+    Write a JSON cache file.
+    The file is written next to its final location and moved into place,
+    so readers never see a partially written entry.
+    """
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+
+    fd, tmp_path = tempfile.mkstemp(dir=CACHE_DIR, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as fh:
+            json.dump(obj, fh)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def get_cached(date: dt.date) -> Optional[Dict[str, List[Any]]]:
+    """
+    Read cached rate columns for a date.
+
+    :param date: datetime.date object.
+    :return: Cached dict of column lists, or None on a cache miss.
+    """
+    return _read_json(_cache_path(date))
+
+
+def put_cached(date: dt.date, columns: Dict[str, List[Any]]) -> None:
+    """
+    Store rate columns for a date.
+
+    :param date: datetime.date object.
+    :param columns: Dict of column lists to cache.
+    """
+    _write_json(_cache_path(date), columns)
+
+
+def get_meta(date: dt.date) -> Optional[Dict[str, str]]:
+    """
+    Read the HTTP validators (ETag / Last-Modified) saved with a date's cached response.
+
+    :param date: datetime.date object.
+    :return: Dict with 'etag' and/or 'last_modified', or None if nothing was saved.
+    """
+    return _read_json(_cache_path(date, ".meta"))
+
+
+def put_meta(date: dt.date, meta: Dict[str, str]) -> None:
+    """
+    Store the HTTP validators of a date's cached response.
+
+    :param date: datetime.date object.
+    :param meta: Dict with 'etag' and/or 'last_modified'.
+    """
+    _write_json(_cache_path(date, ".meta"), meta)
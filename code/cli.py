@@ -1,19 +1,54 @@
+import datetime as dt
+import threading
 import time
-from typing import Optional, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 
+import numpy as np
 import pandas as pd
 
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pcsv
+except ImportError:
+    pa = None
+
 from code.api import fetch_last_n_days
-from code.constants import SUPPORTED_CURRENCIES, DAYS_TO_FETCH, DEFAULT_CSV_FILENAME
+from code.constants import (
+    SUPPORTED_CURRENCIES,
+    DAYS_TO_FETCH,
+    DEFAULT_CSV_FILENAME,
+    DEFAULT_PARQUET_FILENAME,
+    SAVE_EXTENSIONS,
+    FAST_CSV_COLUMNS,
+    FETCH_CACHE_TTL_MINUTES,
+)
 from code.core import (
     records_to_dataframe,
     add_rolling_average,
     format_summary_table,
+    fast_to_csv,
 )
 from code.display import display_breakdown
 
 """CORE LOGIC FOR CLI MENU INTERFACE"""
 
+# Last successful fetch, reused across menu options until it goes stale
+_LAST_FETCH: Optional[Tuple[dt.datetime, pd.DataFrame]] = None
+
+
+class _Prefetch:
+    """Result slot for a background fetch, filled in by its daemon thread."""
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.fetched_at: Optional[dt.datetime] = None
+        self.records: Optional[Dict[str, List[Any]]] = None
+        self.error: Optional[Exception] = None
+
+
+# Background fetch started while the user is at the menu, consumed by _fetch_data
+_PREFETCH: Optional[_Prefetch] = None
+
 def show_menu() -> None:
     """Display the main menu."""
     print("\n==============================")
@@ -22,22 +57,91 @@ def show_menu() -> None:
     print("1) Summary: Current rates + 30-day averages (USD & EUR)")
     print("2) Full breakdown: Detailed stats for USD or EUR")
     print("3) Save current data to CSV")
+    print("3b) Save current data as Parquet")
     print("4) Exit")
 
 
 def _get_filename(default: str) -> str:
-    """Get filename from user input."""
+    """
+    Get filename from user input.
+    Names ending in .csv, .parquet or .feather are kept; anything else gets the default's extension.
+    """
+    import os
+
     filename = input(f"\nEnter filename (default: {default}): ").strip()
     if not filename:
         filename = default
-    if not filename.endswith(".csv"):
-        filename += ".csv"
+    if not filename.endswith(SAVE_EXTENSIONS):
+        filename += os.path.splitext(default)[1]
     return filename
 
 
+def _widen_floats(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Return df with its float32 columns as float64, for saving to files.
+    Values go through their shortest decimal form, so 41.29 is saved as 41.29
+    rather than float32's 41.290000915527344.
+    """
+    float32_columns = df.select_dtypes(include=[np.float32]).columns
+    if float32_columns.empty:
+        return df
+    return df.assign(**{col: df[col].astype(str).astype(np.float64) for col in float32_columns})
+
+
+def _write_csv(df: pd.DataFrame, filepath: str) -> None:
+    """
+    Write DataFrame to a CSV file, using pyarrow's C++ writer when it is available.
+    Generic CSV path for frames not in the FAST_CSV_COLUMNS layout (see _write_dataframe).
+    Output differs slightly between the two writers: pyarrow quotes strings, to_csv does not;
+    both keep full float precision.
+
+    :param df: DataFrame to write (index is not written).
+    :param filepath: Destination path.
+    """
+    if pa is None:
+        # A 1 MiB write buffer keeps to_csv from issuing many small writes
+        with open(filepath, "wb", buffering=1 << 20) as fh:
+            df.to_csv(fh, index=False)
+        return
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+
+    # Write dates as YYYY-MM-DD (like to_csv does), not as full timestamps
+    if "iso_date" in table.column_names:
+        idx = table.column_names.index("iso_date")
+        table = table.set_column(idx, "iso_date", table["iso_date"].cast(pa.date32()))
+
+    pcsv.write_csv(table, filepath)
+
+
+def _write_dataframe(df: pd.DataFrame, filepath: str) -> None:
+    """
+    Write DataFrame in the format given by the file extension.
+    Parquet and Feather are columnar and much faster and smaller than CSV; both need pyarrow.
+    Float columns are saved as float64 (see _widen_floats).
+
+    CSV has two writers. Frames in the FAST_CSV_COLUMNS layout (every save the CLI makes) go
+    through fast_to_csv: unquoted, with floats rounded to 4 decimals. save_data_to_csv also accepts
+    arbitrary DataFrames, which fast_to_csv cannot serialize, so those fall back to _write_csv.
+
+    :param df: DataFrame to write (index is not written).
+    :param filepath: Destination path ending in .csv, .parquet or .feather.
+    """
+    if filepath.endswith(".parquet"):
+        _widen_floats(df).to_parquet(filepath, engine="pyarrow", compression="zstd", compression_level=3, index=False)
+    elif filepath.endswith(".feather"):
+        # Feather only stores a default RangeIndex
+        _widen_floats(df).reset_index(drop=True).to_feather(filepath, compression="lz4")
+    elif tuple(df.columns) == FAST_CSV_COLUMNS:
+        # The fixed rate-data layout skips pandas' per-cell formatting
+        fast_to_csv(df, filepath)
+    else:
+        _write_csv(_widen_floats(df), filepath)
+
+
 def save_data_to_csv(data_df: pd.DataFrame, default_filename: str) -> bool:
     """
-    Save DataFrame to CSV file.
+    Save DataFrame to file (CSV, Parquet or Feather, chosen by the filename extension).
     
     :param data_df: DataFrame to save.
     :param default_filename: Default filename if user doesn't provide one.
@@ -51,19 +155,20 @@ def save_data_to_csv(data_df: pd.DataFrame, default_filename: str) -> bool:
         os.makedirs("data", exist_ok=True)
         filepath = os.path.join("data", filename)
         
+        # Writers do not modify the frame, so an existing rolling average is saved as is
         if "rolling_avg" not in data_df.columns:
             data_df_to_save = add_rolling_average(data_df)
         else:
-            data_df_to_save = data_df.copy()
+            data_df_to_save = data_df
         
-        data_df_to_save.to_csv(filepath, index=False)
+        _write_dataframe(data_df_to_save, filepath)
         
         print(f"\n[INFO] Data saved to {filepath}")
         print(f"[INFO] Saved {len(data_df_to_save)} rows")
         return True
     
     except Exception as e:
-        print(f"\n[ERROR] Failed to save CSV: {e}")
+        print(f"\n[ERROR] Failed to save data: {e}")
         return False
 
 
@@ -99,14 +204,76 @@ def ask_continue_or_save(data_df: Optional[pd.DataFrame] = None, default_filenam
                 print("[ERROR] Please enter 'c' to continue or 'q' to quit.")
 
 
+def _is_fresh(fetched_at: dt.datetime) -> bool:
+    """Whether data downloaded at fetched_at is recent enough to reuse."""
+    return dt.datetime.now() - fetched_at < dt.timedelta(minutes=FETCH_CACHE_TTL_MINUTES)
+
+
+def _fresh_data() -> Optional[pd.DataFrame]:
+    """Return the last fetched DataFrame if it is recent enough to reuse, else None."""
+    if _LAST_FETCH is None:
+        return None
+    fetched_at, cached_df = _LAST_FETCH
+    if _is_fresh(fetched_at):
+        return cached_df
+    return None
+
+
+def _run_prefetch(prefetch: _Prefetch) -> None:
+    """
+    Background thread body: store the fetched records with their completion time, or the fetch error.
+    The time is taken when the download finishes, not when the result is later consumed.
+    """
+    try:
+        prefetch.records = fetch_last_n_days(DAYS_TO_FETCH)
+        prefetch.fetched_at = dt.datetime.now()
+    except Exception as e:
+        prefetch.error = e
+    finally:
+        prefetch.done.set()
+
+
+def _start_prefetch() -> None:
+    """
+    Start fetching data in a background thread, so it is (mostly) ready by the time an option is chosen.
+    Nothing is started if a prefetch is already pending or the loaded data is still fresh.
+    """
+    global _PREFETCH
+
+    if _PREFETCH is None and _fresh_data() is None:
+        _PREFETCH = _Prefetch()
+        # Daemon thread: exiting the app abandons a pending download instead of waiting on the network
+        threading.Thread(target=_run_prefetch, args=(_PREFETCH,), name="nbu-prefetch", daemon=True).start()
+
+
 def _fetch_data() -> Optional[pd.DataFrame]:
-    """Fetch and return data, or None if failed."""
+    """Fetch and return data, or None if failed. Recent data is reused instead of re-fetched."""
+    global _LAST_FETCH, _PREFETCH
+
+    cached_df = _fresh_data()
+    if cached_df is not None:
+        print(f"\n> Using currency data fetched at {_LAST_FETCH[0]:%H:%M:%S}")
+        return cached_df
+
     print(f"\n> Fetching last {DAYS_TO_FETCH} days of currency data (USD and EUR only)...")
     start_time = time.time()
     
     try:
-        records = fetch_last_n_days(DAYS_TO_FETCH)
+        records = None
+        if _PREFETCH is not None:
+            # Take the background result (waiting for it if needed); the next menu prompt starts a new one
+            prefetch, _PREFETCH = _PREFETCH, None
+            prefetch.done.wait()
+            # A failed prefetch, or one that finished too long ago (user idle at the menu),
+            # is discarded and the data is fetched again now
+            if prefetch.error is None and _is_fresh(prefetch.fetched_at):
+                records, fetched_at = prefetch.records, prefetch.fetched_at
+        if records is None:
+            records = fetch_last_n_days(DAYS_TO_FETCH)
+            fetched_at = dt.datetime.now()
         df = records_to_dataframe(records)
+        if not df.empty:
+            _LAST_FETCH = (fetched_at, df)
         elapsed_time = time.time() - start_time
         print(f"[INFO] Query completed in {elapsed_time:.2f} seconds")
         return df
@@ -149,26 +316,26 @@ def _handle_option_2(df: Optional[pd.DataFrame]) -> Tuple[Optional[pd.DataFrame]
         return currency_df_rolling, currency
 
 
-def _handle_option_3(df: Optional[pd.DataFrame]) -> None:
-    """Handle Option 3: Save data."""
+def _handle_option_3(df: Optional[pd.DataFrame], default_filename: str = DEFAULT_CSV_FILENAME) -> None:
+    """Handle Option 3/3b: Save data (CSV by default, Parquet for 3b)."""
     if df is None or df.empty:
         print("\n[WARN] No data loaded. Please fetch data first (option 1 or 2).")
         return
     
-    filename = _get_filename(DEFAULT_CSV_FILENAME)
+    filename = _get_filename(default_filename)
     import os
     
     try:
         os.makedirs("data", exist_ok=True)
         filepath = os.path.join("data", filename)
         
-        df_to_save = add_rolling_average(df)
-        df_to_save.to_csv(filepath, index=False)
+        df_to_save = df if "rolling_avg" in df.columns else add_rolling_average(df)
+        _write_dataframe(df_to_save, filepath)
         
         print(f"\n[INFO] Data saved to {filepath}")
         print(f"[INFO] Saved {len(df_to_save)} rows")
     except Exception as e:
-        print(f"\n[ERROR] Failed to save CSV: {e}")
+        print(f"\n[ERROR] Failed to save data: {e}")
 
 
 def run_cli() -> None:
@@ -181,7 +348,9 @@ def run_cli() -> None:
     show_menu()
     
     while True:
-        choice = input("Choose an option [1-4]: ").strip()
+        # Fetch in the background while the user is reading the menu
+        _start_prefetch()
+        choice = input("Choose an option [1, 2, 3, 3b, 4]: ").strip()
 
         if choice == "1":
             result_df = _handle_option_1()
@@ -211,8 +380,14 @@ def run_cli() -> None:
                 break
             show_menu()
 
+        elif choice.lower() == "3b":
+            _handle_option_3(df, DEFAULT_PARQUET_FILENAME)
+            if not ask_continue_or_save():
+                break
+            show_menu()
+
         elif choice == "4":
             print("\nExiting.")
             break
         else:
-            print("\n[ERROR] Invalid choice. Choose 1, 2, 3, or 4.")
\ No newline at end of file
+            print("\n[ERROR] Invalid choice. Choose 1, 2, 3, 3b, or 4.")
\ No newline at end of file
@@ -4,4 +4,9 @@ SUPPORTED_CURRENCIES = ["USD", "EUR"]
 DAYS_TO_FETCH = 30
 ROLLING_WINDOW = 7
 DEFAULT_CSV_FILENAME = "currency_rates.csv"
+DEFAULT_PARQUET_FILENAME = "currency_rates.parquet"
+SAVE_EXTENSIONS = (".csv", ".parquet", ".feather")
+# Column layout of saved rate data that fast_to_csv knows how to serialize
+FAST_CSV_COLUMNS = ("iso_date", "cc", "rate", "rolling_avg")
+FETCH_CACHE_TTL_MINUTES = 60
 
@@ -1,40 +1,58 @@
-from typing import List, Dict, Any, Optional
+import math
+from typing import List, Dict, Any, Optional, Tuple
 
 import numpy as np
 import pandas as pd
 from tabulate import tabulate
 
-from code.constants import SUPPORTED_CURRENCIES, ROLLING_WINDOW
+try:
+    from numba import njit
+except ImportError:
+    def njit(*args, **kwargs):
+        """Fallback when numba is not installed: kernels run as plain Python."""
+        def decorator(func):
+            return func
+        return decorator
+
+from code.constants import SUPPORTED_CURRENCIES, ROLLING_WINDOW, FAST_CSV_COLUMNS
 
 """CORE LOGIC FOR NBU DATA MANIPULATION"""
 
-def records_to_dataframe(records: List[Dict[str, Any]]) -> pd.DataFrame:
+def records_to_dataframe(records: Dict[str, List[Any]]) -> pd.DataFrame:
     """
-    Convert raw NBU records list into DataFrame.
+    Convert column-wise NBU rates into DataFrame.
 
     We want:
       - iso_date: normalized date (string or datetime)
       - cc: currency code, e.g. 'USD'
       - rate: exchange rate in UAH per unit of currency
     
-    Only USD and EUR currencies are kept.
+    Records are expected to contain USD and EUR only, as returned by the api module.
+
+    :param records: Dict of 'iso_date', 'cc' and 'rate' lists, as returned by the api module.
+    :return: DataFrame built column-wise, without per-row dtype inference.
     """
-    if not records:
+    if not records or not records.get("cc"):
         return pd.DataFrame(columns=["iso_date", "cc", "rate"])
 
-    df = pd.DataFrame(records)
-
-    # Keep only relevant columns if they exist
-    cols = [c for c in ["iso_date", "cc", "rate"] if c in df.columns]
-    df = df[cols]
-
-    # Filter to only supported currencies
-    df = df[df["cc"].isin(SUPPORTED_CURRENCIES)].copy()
+    # The api module already filters to supported currencies, so no mask (or copy) is needed here
+    df = pd.DataFrame(records, columns=["iso_date", "cc", "rate"])
 
     df["iso_date"] = pd.to_datetime(df["iso_date"])
-    df["rate"] = pd.to_numeric(df["rate"], errors="coerce")
+    # Fixed categories: one int8 code per row, so currency masks and groupbys compare integers, not strings
+    df["cc"] = pd.Categorical(df["cc"], categories=SUPPORTED_CURRENCIES)
+    # Missing rates arrive as None and become NaN here.
+    # float32 (~7 significant digits) halves the column size. It is exact for 4-decimal USD/EUR rates
+    # only at 4-decimal display precision (41.29 is stored as 41.290000915527344), so saved files
+    # widen float columns back to float64 first. Derived values such as averages can differ from
+    # float64 in their last digit.
+    df["rate"] = pd.to_numeric(df["rate"], errors="coerce", downcast="float").astype(np.float32)
     df = df.dropna(subset=["rate"])
 
+    # Sort once and index by currency, so per-currency lookups need neither a mask nor a re-sort.
+    # The index is left unnamed so 'cc' still refers unambiguously to the column (e.g. in groupby).
+    df = df.sort_values("iso_date", kind="stable").set_index("cc", drop=False).rename_axis(None)
+
     return df
 
 
@@ -42,21 +60,51 @@ def filter_currency(df: pd.DataFrame, currency_code: str) -> pd.DataFrame:
     """
     Filter the DataFrame by currency code (USD or EUR only).
 
-    :param df: DataFrame with column 'cc'.
+    :param df: DataFrame with columns 'iso_date' and 'cc'.
     :param currency_code: Currency code to filter (USD or EUR), case-insensitive.
     :return: Filtered DataFrame sorted by date.
     """
     currency_code = currency_code.upper()
     if currency_code not in SUPPORTED_CURRENCIES:
         return pd.DataFrame(columns=["iso_date", "cc", "rate"])
-    
-    filtered = df[df["cc"] == currency_code].copy()
-    return filtered.sort_values("iso_date")
+
+    # Fast path for date-sorted, currency-indexed frames built by records_to_dataframe
+    if df.index.equals(pd.Index(df["cc"])):
+        if currency_code not in df.index:
+            return pd.DataFrame(columns=["iso_date", "cc", "rate"])
+        return df.loc[[currency_code]]
+
+    return df[df["cc"] == currency_code].sort_values("iso_date")
+
+
+@njit(cache=True)
+def _stats4(rates: np.ndarray) -> Tuple[float, float, float, float]:
+    """
+    Single-pass mean, population std, min and max of a non-empty array.
+    Uses Welford's update for the variance, which stays accurate for rates
+    whose spread is tiny compared to their magnitude.
+    """
+    mean = 0.0
+    m2 = 0.0
+    mn = float(rates[0])
+    mx = float(rates[0])
+
+    for i in range(len(rates)):
+        x = float(rates[i])
+        delta = x - mean
+        mean += delta / (i + 1)
+        m2 += delta * (x - mean)
+        if x < mn:
+            mn = x
+        if x > mx:
+            mx = x
+
+    return mean, math.sqrt(m2 / len(rates)), mn, mx
 
 
 def compute_stats(df: pd.DataFrame) -> Optional[Dict[str, float]]:
     """
-    Compute mean, std, min, max for the 'rate' column using numpy.
+    Compute mean, std, min, max for the 'rate' column in one pass over the data.
 
     :param df: DataFrame filtered to a single currency.
     :return: Dict with statistics, or None if df is empty.
@@ -65,15 +113,42 @@ def compute_stats(df: pd.DataFrame) -> Optional[Dict[str, float]]:
         return None
 
     rates = df["rate"].to_numpy()
+    mean, std, mn, mx = _stats4(rates)  # std is the population std, as with numpy.std()
 
     return {
-        "mean": float(np.mean(rates)),
-        "std": float(np.std(rates)),  # population std using numpy.std()
-        "min": float(np.min(rates)),
-        "max": float(np.max(rates)),
+        "mean": float(mean),
+        "std": float(std),
+        "min": float(mn),
+        "max": float(mx),
     }
 
 
+def _format_small_table(rows: List[Dict[str, str]]) -> str:
+    """
+    Render already-formatted string cells as a boxed table, in the same layout as
+    tabulate's "pretty" format (centered cells, one space of padding).
+    For the few-row summary tables this avoids building a DataFrame and running tabulate.
+
+    :param rows: Non-empty list of dicts sharing the same keys (the column headers).
+    :return: Table string.
+    """
+    headers = list(rows[0].keys())
+    table = [headers] + [[row[h] for h in headers] for row in rows]
+    widths = [max(len(line[i]) for line in table) for i in range(len(headers))]
+
+    def center(cell: str, width: int) -> str:
+        # Same split as tabulate: an odd leftover space goes to the right
+        left = (width - len(cell)) // 2
+        return " " * left + cell + " " * (width - len(cell) - left)
+
+    def render(line: List[str]) -> str:
+        return "| " + " | ".join(center(cell, w) for cell, w in zip(line, widths)) + " |"
+
+    border = "+" + "+".join("-" * (w + 2) for w in widths) + "+"
+    lines = [border, render(headers), border] + [render(line) for line in table[1:]] + [border]
+    return "\n".join(lines)
+
+
 def format_stats_table(stats: Dict[str, float], currency_code: str) -> str:
     """
     Format statistics as a table for CLI output.
@@ -82,15 +157,42 @@ def format_stats_table(stats: Dict[str, float], currency_code: str) -> str:
     :param currency_code: Currency code for display.
     :return: Formatted table string.
     """
-    stats_df = pd.DataFrame([{
+    return _format_small_table([{
         "Currency": currency_code,
         "Mean": f"{stats['mean']:.4f}",
         "Std": f"{stats['std']:.4f}",
         "Min": f"{stats['min']:.4f}",
         "Max": f"{stats['max']:.4f}"
     }])
-    
-    return tabulate(stats_df, headers="keys", tablefmt="pretty", showindex=False)
+
+
+@njit(cache=True)
+def _rolling_mean(rates: np.ndarray, window: int) -> np.ndarray:
+    """
+    Trailing mean over up to `window` values (like rolling(window, min_periods=1).mean()),
+    kept as a running sum and count so each step is one add and one subtract.
+    NaNs are skipped, and a window holding only NaNs gives NaN.
+    """
+    if window < 1:
+        raise ValueError("window must be at least 1")
+
+    out = np.empty_like(rates)
+    total = 0.0
+    count = 0
+
+    for i in range(len(rates)):
+        value = float(rates[i])
+        if not math.isnan(value):
+            total += value
+            count += 1
+        if i >= window:
+            dropped = float(rates[i - window])
+            if not math.isnan(dropped):
+                total -= dropped
+                count -= 1
+        out[i] = total / count if count else np.nan
+
+    return out
 
 
 def add_rolling_average(df: pd.DataFrame, window: int = ROLLING_WINDOW) -> pd.DataFrame:
@@ -101,16 +203,39 @@ def add_rolling_average(df: pd.DataFrame, window: int = ROLLING_WINDOW) -> pd.Da
     :param window: Rolling window size (default 7 days).
     :return: DataFrame with added 'rolling_avg' column.
     """
-    df = df.copy()
-    df = df.sort_values("iso_date")
-    df["rolling_avg"] = df["rate"].rolling(window=window, min_periods=1).mean()
-    return df
+    # sort_values already returns a new frame, so no extra copy is needed before adding the column
+    return df.sort_values("iso_date", kind="stable").assign(
+        rolling_avg=lambda d: _rolling_mean(d["rate"].to_numpy(dtype=np.float32), window)
+    )
+
+
+def fast_to_csv(df: pd.DataFrame, filepath: str) -> None:
+    """
+    Write rate data as CSV by assembling the lines with vectorized NumPy string ops,
+    instead of pandas' per-cell formatting.
+    Expects the FAST_CSV_COLUMNS layout: dates are written as YYYY-MM-DD, floats with 4 decimals.
+
+    :param df: DataFrame with iso_date, cc, rate and rolling_avg columns.
+    :param filepath: Destination path.
+    """
+    dates = df["iso_date"].dt.strftime("%Y-%m-%d").to_numpy(dtype=str)
+    codes = df["cc"].astype(str).to_numpy(dtype=str)
+    rates = np.char.mod("%.4f", df["rate"].to_numpy(dtype=np.float64))
+    rolling = np.char.mod("%.4f", df["rolling_avg"].to_numpy(dtype=np.float64))
+
+    lines = np.char.add(np.char.add(dates, ","), codes)
+    lines = np.char.add(np.char.add(lines, ","), rates)
+    lines = np.char.add(np.char.add(lines, ","), rolling)
+
+    with open(filepath, "w", encoding="utf-8", newline="") as fh:
+        fh.write(",".join(FAST_CSV_COLUMNS) + "\n")
+        fh.write("".join(line + "\n" for line in lines.tolist()))
 
 
 def format_table(df: pd.DataFrame, max_rows: int = 20) -> str:
     """
     Format a DataFrame as a pretty table for CLI output.
-    Formats iso_date to show only date (no time) and rolling_avg to 4 decimals.
+    Formats iso_date to show only date (no time), and rate and rolling_avg to 4 decimals.
 
     :param df: DataFrame to display.
     :param max_rows: Max rows to show.
@@ -125,9 +250,11 @@ def format_table(df: pd.DataFrame, max_rows: int = 20) -> str:
     if "iso_date" in df_sorted.columns:
         df_sorted["iso_date"] = df_sorted["iso_date"].dt.date
     
-    # Format rolling_avg to 4 decimal places
-    if "rolling_avg" in df_sorted.columns:
-        df_sorted["rolling_avg"] = df_sorted["rolling_avg"].round(4)
+    # Format rate and rolling_avg to 4 decimal places.
+    # Rounding happens in float64, as float32 values would otherwise print with representation noise.
+    for col in ["rate", "rolling_avg"]:
+        if col in df_sorted.columns:
+            df_sorted[col] = df_sorted[col].astype(np.float64).round(4)
 
     if len(df_sorted) > max_rows:
         df_to_show = df_sorted.head(max_rows)
@@ -184,43 +311,40 @@ def format_summary_table(df: pd.DataFrame) -> str:
     """
     Format a summary table showing current rates and 30-day averages for USD and EUR.
 
+    Current and average rates for all currencies come from a single groupby pass
+    over the date-sorted data, rather than filtering the DataFrame per currency.
+
     :param df: DataFrame with currency data.
     :return: Formatted summary table string.
     """
-    # Get current rates and averages
-    usd_current = get_current_rate(df, "USD")
-    usd_avg = get_avg_rate(df, "USD")
-    eur_current = get_current_rate(df, "EUR")
-    eur_avg = get_avg_rate(df, "EUR")
-    
-    # Get current date for display
-    if not df.empty:
-        current_date = df["iso_date"].max().date()
-    else:
-        current_date = "N/A"
-    
+    if df.empty:
+        return "No data available for summary."
+
+    # Current date for display
+    current_date = df["iso_date"].max().date()
+
+    # Current (latest) rate and average per currency, in SUPPORTED_CURRENCIES order
+    grouped = (
+        df.sort_values("iso_date")
+        .groupby("cc", sort=False, observed=True)["rate"]
+        .agg(current="last", avg="mean")
+        .reindex(SUPPORTED_CURRENCIES)
+        .dropna()
+    )
+
     summary_data = []
-    
-    if usd_current is not None and usd_avg is not None:
-        summary_data.append({
-            "Currency": "USD",
-            "Current Rate": f"{usd_current:.4f}",
-            "30-Day Avg": f"{usd_avg:.4f}",
-            "Difference": f"{usd_current - usd_avg:+.4f}"
-        })
-    
-    if eur_current is not None and eur_avg is not None:
+
+    for row in grouped.itertuples():
         summary_data.append({
-            "Currency": "EUR",
-            "Current Rate": f"{eur_current:.4f}",
-            "30-Day Avg": f"{eur_avg:.4f}",
-            "Difference": f"{eur_current - eur_avg:+.4f}"
+            "Currency": row.Index,
+            "Current Rate": f"{row.current:.4f}",
+            "30-Day Avg": f"{row.avg:.4f}",
+            "Difference": f"{row.current - row.avg:+.4f}"
         })
     
     if not summary_data:
         return "No data available for summary."
     
-    summary_df = pd.DataFrame(summary_data)
-    table = tabulate(summary_df, headers="keys", tablefmt="pretty", showindex=False)
+    table = _format_small_table(summary_data)
     
     return f"\nCurrency Summary (Last 30 Days)\nDate: {current_date}\n\n{table}"
\ No newline at end of file